@@ -1,22 +1,55 @@
+import functools
 import os
-from dotenv import load_dotenv
+import sys
+from typing import Dict
 
-load_dotenv()
+
+def bootstrap() -> Dict[str, str]:
+    """
+    Load .env values into the process environment and snapshot it
+
+    Prefers the pre-built env_config module (see scripts/build_env_config.py)
+    and only parses .env with python-dotenv when it is missing. Variables
+    already set in the process environment always win, as with load_dotenv().
+    With APP_ENV=production nothing is loaded: the container/orchestrator is
+    expected to inject the variables directly (docker -e, compose or k8s env).
+
+    Returns:
+        Plain dict copy of os.environ
+    """
+    if os.environ.get("APP_ENV", "development") == "production":
+        return dict(os.environ)
+
+    try:
+        from env_config import ENV
+    except ImportError:
+        from dotenv import load_dotenv
+        load_dotenv()
+    else:
+        for key, value in ENV.items():
+            os.environ.setdefault(key, value)
+    return dict(os.environ)
+
+
+# Single environment snapshot; settings below read from it instead of os.getenv
+_ENV = bootstrap()
 
 
 class Config:
     """Application configuration"""
-    GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-    GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-    HUGGINGFACE_API_KEY = os.getenv("HUGGINGFACE_API_KEY")
-    OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
-    PORT = int(os.getenv("PORT", 9000))
+    GROQ_API_KEY = _ENV.get("GROQ_API_KEY")
+    GEMINI_API_KEY = _ENV.get("GEMINI_API_KEY")
+    HUGGINGFACE_API_KEY = _ENV.get("HUGGINGFACE_API_KEY")
+    OPENROUTER_API_KEY = _ENV.get("OPENROUTER_API_KEY")
+    PORT = int(_ENV.get("PORT", 9000))
+    WORKERS = int(_ENV.get("WORKERS", 1))  # uvicorn worker processes
     HOST = "0.0.0.0"
-    
+
     # Audio processing settings
-    AUDIO_SAMPLE_RATE = "16000"
-    AUDIO_CHANNELS = "1"
-    
+    # Canonical interned strings, passed as-is to FFmpeg
+    AUDIO_SAMPLE_RATE = sys.intern("16000")
+    AUDIO_CHANNELS = sys.intern("1")
+
     # AI Model settings (optimized for speed and reliability)
     GROQ_TRANSCRIPTION_MODEL = "whisper-large-v3-turbo"  # Faster transcription
     GROQ_CHAT_MODEL = "llama-3.3-70b-versatile"  # Better quality, still fast
@@ -25,23 +58,54 @@ class Config:
     HUGGINGFACE_MODEL = "meta-llama/Llama-3.2-3B-Instruct"
     OPENROUTER_MODEL = "meta-llama/llama-3.2-3b-instruct:free"
     OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
-    
+
     # Performance settings
     REQUEST_TIMEOUT = 60  # seconds
     MAX_RETRIES = 2
     ENABLE_CACHE = True
     ENABLE_FALLBACK = True  # Auto fallback to other services on error
-    
+    PROMPT_CACHE_MAX_SIZE = 64
+    PROMPT_CACHE_TTL = 300  # seconds
+    RESULT_CACHE_MAX_SIZE = 256  # processed uploads remembered by audio digest
+    RESULT_CACHE_TTL = 3600  # seconds
+    HTTP_MAX_KEEPALIVE = 10  # idle pooled connections kept for the LLM APIs
+    HTTP_KEEPALIVE_EXPIRY = 30.0  # seconds; httpx's default of 5 s drops them between requests
+
     # MongoDB settings
-    MONGODB_HOST = os.getenv("MONGODB_HOST", "localhost")
-    MONGODB_PORT = os.getenv("MONGODB_PORT", "27017")
-    MONGODB_USERNAME = os.getenv("MONGODB_USERNAME", "")
-    MONGODB_PASSWORD = os.getenv("MONGODB_PASSWORD", "")
-    MONGODB_DATABASE = os.getenv("MONGODB_DATABASE", "video_profile_extractor")
-    MONGODB_AUTH_DATABASE = os.getenv("MONGODB_AUTH_DATABASE", "admin")
-    
+    MONGODB_HOST = _ENV.get("MONGODB_HOST", "localhost")
+    MONGODB_PORT = int(_ENV.get("MONGODB_PORT", 27017))
+    MONGODB_USERNAME = _ENV.get("MONGODB_USERNAME", "")
+    MONGODB_PASSWORD = _ENV.get("MONGODB_PASSWORD", "")
+    MONGODB_DATABASE = _ENV.get("MONGODB_DATABASE", "video_profile_extractor")
+    MONGODB_AUTH_DATABASE = _ENV.get("MONGODB_AUTH_DATABASE", "admin")
+
+    # MongoDB connection pool settings (per worker process)
+    MONGODB_MAX_POOL_SIZE = int(_ENV.get("MONGODB_MAX_POOL_SIZE", 10))
+    MONGODB_MIN_POOL_SIZE = int(_ENV.get("MONGODB_MIN_POOL_SIZE", 2))
+    MONGODB_MAX_IDLE_TIME_MS = int(_ENV.get("MONGODB_MAX_IDLE_TIME_MS", 60000))
+    MONGODB_CONNECT_TIMEOUT_MS = int(_ENV.get("MONGODB_CONNECT_TIMEOUT_MS", 5000))
+    MONGODB_SOCKET_TIMEOUT_MS = int(_ENV.get("MONGODB_SOCKET_TIMEOUT_MS", 10000))
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS = int(_ENV.get("MONGODB_SERVER_SELECTION_TIMEOUT_MS", 5000))
+
     @classmethod
-    def validate(cls):
-        """Validate required configuration"""
-        if not any([cls.GROQ_API_KEY, cls.GEMINI_API_KEY, cls.HUGGINGFACE_API_KEY, cls.OPENROUTER_API_KEY]):
+    @functools.lru_cache(maxsize=1)
+    def validate(cls) -> bool:
+        """Validate required configuration (result cached: settings are fixed at import)"""
+        if not any((cls.GROQ_API_KEY, cls.GEMINI_API_KEY, cls.HUGGINGFACE_API_KEY, cls.OPENROUTER_API_KEY)):
             raise ValueError("At least one API key must be set")
+        return True
+
+
+# Hot-path settings as plain module constants (same objects as on Config)
+MONGODB_HOST = Config.MONGODB_HOST
+MONGODB_PORT = Config.MONGODB_PORT
+MONGODB_USERNAME = Config.MONGODB_USERNAME
+MONGODB_PASSWORD = Config.MONGODB_PASSWORD
+MONGODB_DATABASE = Config.MONGODB_DATABASE
+MONGODB_AUTH_DATABASE = Config.MONGODB_AUTH_DATABASE
+MONGODB_MAX_POOL_SIZE = Config.MONGODB_MAX_POOL_SIZE
+MONGODB_MIN_POOL_SIZE = Config.MONGODB_MIN_POOL_SIZE
+MONGODB_MAX_IDLE_TIME_MS = Config.MONGODB_MAX_IDLE_TIME_MS
+MONGODB_CONNECT_TIMEOUT_MS = Config.MONGODB_CONNECT_TIMEOUT_MS
+MONGODB_SOCKET_TIMEOUT_MS = Config.MONGODB_SOCKET_TIMEOUT_MS
+MONGODB_SERVER_SELECTION_TIMEOUT_MS = Config.MONGODB_SERVER_SELECTION_TIMEOUT_MS
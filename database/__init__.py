@@ -1,4 +1,12 @@
-from .mongodb import MongoDBClient
 from .prompt_repository import PromptRepository
+from .prompt_template import Prompt
 
-__all__ = ['MongoDBClient', 'PromptRepository']
+__all__ = ['MongoDBClient', 'PromptRepository', 'Prompt']
+
+
+def __getattr__(name):
+    # Lazy so importing the package (e.g. for default prompts) does not load pymongo
+    if name == 'MongoDBClient':
+        from .mongodb import MongoDBClient
+        return MongoDBClient
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
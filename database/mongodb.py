@@ -1,6 +1,23 @@
+import atexit
+import functools
+import os
+import threading
+import time
+from typing import Optional, Tuple
+from urllib.parse import quote_plus
 from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure
-from config import Config
+from pymongo.errors import (
+    ConfigurationError, ConnectionFailure, OperationFailure, ServerSelectionTimeoutError
+)
+from utils import setup_logger
+from config import (
+    MONGODB_HOST, MONGODB_PORT, MONGODB_USERNAME, MONGODB_PASSWORD,
+    MONGODB_DATABASE, MONGODB_AUTH_DATABASE,
+    MONGODB_MAX_POOL_SIZE, MONGODB_MIN_POOL_SIZE, MONGODB_MAX_IDLE_TIME_MS,
+    MONGODB_CONNECT_TIMEOUT_MS, MONGODB_SOCKET_TIMEOUT_MS, MONGODB_SERVER_SELECTION_TIMEOUT_MS
+)
+
+logger = setup_logger(__name__)
 
 
 class MongoDBClient:
@@ -8,68 +25,177 @@ class MongoDBClient:
     
     _instance = None
     _client = None
+    _lock = threading.Lock()
+    _hooks_registered = False
+    _failed_at: Optional[float] = None  # monotonic time of the last failed connect
+    _db = None
+    _prompts = None
+    
+    PROMPTS_COLLECTION = "prompts"
+    RECONNECT_BACKOFF = 30.0  # seconds between connection attempts after a failure
     
     def __new__(cls):
+        # Double-checked locking so concurrent first access builds one instance
         if cls._instance is None:
-            cls._instance = super().__new__(cls)
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
         return cls._instance
     
     def __init__(self):
-        if self._client is None:
-            self._connect()
+        # Connection is opened lazily on first client/database access
+        self._register_process_hooks()
     
-    def _build_connection_uri(self):
-        """Build MongoDB connection URI from config"""
-        if Config.MONGODB_USERNAME and Config.MONGODB_PASSWORD:
-            # With authentication
-            uri = (
-                f"mongodb://{Config.MONGODB_USERNAME}:{Config.MONGODB_PASSWORD}"
-                f"@{Config.MONGODB_HOST}:{Config.MONGODB_PORT}/"
-                f"{Config.MONGODB_DATABASE}?authSource={Config.MONGODB_AUTH_DATABASE}"
-            )
+    @classmethod
+    def _register_process_hooks(cls):
+        """Register exit/fork hooks once per process"""
+        if cls._hooks_registered:
+            return
+        cls._hooks_registered = True
+        atexit.register(cls._close_instance)
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=cls._reset_after_fork)
+    
+    @classmethod
+    def _close_instance(cls):
+        """Close the current singleton's connection, if any"""
+        if cls._instance is not None:
+            cls._instance.disconnect()
+    
+    @classmethod
+    def _reset_after_fork(cls):
+        """
+        Forget the parent's client in a forked child
+        
+        The child builds its own pool on first use instead of sharing sockets
+        inherited from the parent process.
+        """
+        cls._lock = threading.Lock()
+        if cls._instance is not None:
+            cls._instance._client = None
+        cls._instance = None
+    
+    def disconnect(self):
+        """Close the MongoDB connection and drop the singleton"""
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+            self._db = None
+            self._prompts = None
+            self._failed_at = None
+            MongoDBClient._instance = None
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=1)
+    def _build_connection_uri() -> Tuple[str, str]:
+        """
+        Build MongoDB connection URI from config
+        
+        Memoized: the settings are fixed for the process, so reconnects after
+        disconnect() reuse the same strings.
+        
+        Returns:
+            (connection_uri, safe_uri) where safe_uri masks the password for logs
+        """
+        host = f"{MONGODB_HOST}:{MONGODB_PORT}"
+        
+        if MONGODB_USERNAME and MONGODB_PASSWORD:
+            # With authentication (credentials must be percent-encoded)
+            user = quote_plus(MONGODB_USERNAME)
+            password = quote_plus(MONGODB_PASSWORD)
+            path = f"{MONGODB_DATABASE}?authSource={MONGODB_AUTH_DATABASE}"
+            uri = f"mongodb://{user}:{password}@{host}/{path}"
+            safe_uri = f"mongodb://{user}:****@{host}/{path}"
         else:
             # Without authentication (local development)
-            uri = f"mongodb://{Config.MONGODB_HOST}:{Config.MONGODB_PORT}/"
+            uri = safe_uri = f"mongodb://{host}/"
         
-        return uri
+        return uri, safe_uri
+    
+    def _retry_due(self) -> bool:
+        """True if no connect has failed yet, or the last failure is older than the backoff"""
+        return self._failed_at is None or time.monotonic() - self._failed_at >= self.RECONNECT_BACKOFF
+    
+    def _ensure_connected(self):
+        """Connect on first use; after a failure, retry at most once per backoff period"""
+        if self._client is None and self._retry_due():
+            self._connect()
     
     def _connect(self):
-        """Connect to MongoDB"""
+        """
+        Connect to MongoDB (only one thread connects, others reuse the client)
+        
+        The first attempt is waited for by every caller. Reconnects after a
+        failure are made by one thread while the others keep using the default
+        prompts instead of queueing on the lock for the server selection timeout.
+        """
+        if not self._lock.acquire(blocking=self._failed_at is None):
+            return
         try:
-            connection_uri = self._build_connection_uri()
-            
-            # Hide password in logs
-            safe_uri = connection_uri.replace(
-                f":{Config.MONGODB_PASSWORD}@" if Config.MONGODB_PASSWORD else "",
-                ":****@" if Config.MONGODB_PASSWORD else ""
-            )
+            if self._client is None and self._retry_due():
+                self._open_client()
+                self._failed_at = None if self._client is not None else time.monotonic()
+        finally:
+            self._lock.release()
+    
+    def _open_client(self):
+        """
+        Create the MongoClient and verify the connection
+        
+        The client is built and pinged in a local and only published (after the
+        database/collection handles) once it works, so the unlocked fast path in
+        _ensure_connected never sees a half-initialized or doomed client.
+        """
+        client = None
+        try:
+            connection_uri, safe_uri = self._build_connection_uri()
             
-            self._client = MongoClient(
+            client = MongoClient(
                 connection_uri,
-                serverSelectionTimeoutMS=5000
+                serverSelectionTimeoutMS=MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+                connectTimeoutMS=MONGODB_CONNECT_TIMEOUT_MS,
+                socketTimeoutMS=MONGODB_SOCKET_TIMEOUT_MS,
+                maxPoolSize=MONGODB_MAX_POOL_SIZE,
+                minPoolSize=MONGODB_MIN_POOL_SIZE,
+                maxIdleTimeMS=MONGODB_MAX_IDLE_TIME_MS,
+                retryWrites=True,
+                appname="video_profile_extractor"
             )
             
             # Test connection
-            self._client.admin.command('ping')
-            print(f"Connected to MongoDB: {safe_uri}")
-        except ConnectionFailure as e:
-            print(f"Failed to connect to MongoDB: {e}")
-            print("Using default prompts from code")
-            self._client = None
-        except Exception as e:
-            print(f"Unexpected error connecting to MongoDB: {e}")
-            print("Using default prompts from code")
-            self._client = None
+            client.admin.command('ping')
+        except (ConnectionFailure, ServerSelectionTimeoutError, ConfigurationError, OperationFailure) as e:
+            # Expected connectivity/auth/URI problems: fall back to default prompts.
+            # Anything else is a programming error and propagates.
+            logger.warning("Failed to connect to MongoDB: %s; using default prompts from code (retrying in %.0f s)", e, self.RECONNECT_BACKOFF)
+            if client is not None:
+                client.close()
+            return
+        
+        # Cache database/collection handles so accessors don't rebuild them;
+        # _client is assigned last, it is what the fast path checks
+        self._db = client[MONGODB_DATABASE]
+        self._prompts = self._db[self.PROMPTS_COLLECTION]
+        self._client = client
+        logger.info("Connected to MongoDB: %s", safe_uri)
     
     @property
     def client(self):
+        self._ensure_connected()
         return self._client
     
     @property
     def database(self):
-        if self._client:
-            return self._client[Config.MONGODB_DATABASE]
-        return None
+        self._ensure_connected()
+        return self._db
+    
+    @property
+    def prompts(self):
+        """Cached handle to the prompts collection (None when disconnected)"""
+        self._ensure_connected()
+        return self._prompts
     
     def is_connected(self):
+        self._ensure_connected()
         return self._client is not None
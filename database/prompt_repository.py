@@ -1,144 +1,257 @@
+import functools
+import gzip
+import threading
+from collections.abc import Mapping
+from importlib import resources
+from types import MappingProxyType
 from typing import Optional
-from .mongodb import MongoDBClient
+from config import Config
+from utils import MISS, TTLCache
+from .prompt_template import Prompt
+
+
+@functools.cache
+def _mongodb_client_class():
+    """Import the MongoDB client (and pymongo) only when a query is actually made"""
+    from .mongodb import MongoDBClient
+    return MongoDBClient
+
+
+@functools.lru_cache(maxsize=8)
+def load_default_template(prompt_name: str) -> str:
+    """Read and decompress a default template from database/prompts/<name>.txt.gz"""
+    resource = resources.files(__package__).joinpath("prompts").joinpath(f"{prompt_name}.txt.gz")
+    return gzip.decompress(resource.read_bytes()).decode("utf-8")
+
+
+class _DefaultPrompt(Mapping):
+    """Read-only default prompt whose template is loaded from disk on first access"""
+    
+    __slots__ = ("_fields",)
+    
+    def __init__(self, **fields):
+        self._fields = fields
+    
+    def __getitem__(self, key):
+        if key == "template":
+            return load_default_template(self._fields["name"])
+        return self._fields[key]
+    
+    def __iter__(self):
+        yield from self._fields
+        yield "template"
+    
+    def __len__(self):
+        return len(self._fields) + 1
+
+
+# Fields read from prompt documents (skips _id and any audit metadata).
+# Every field is part of _COVERING_INDEX, so the planner can answer name lookups from the
+# index alone (no hint: naming a dropped index would make queries fail);
+# "variables" is left out because array fields make an index multikey, which cannot cover.
+_PROMPT_PROJECTION = {"_id": 0, "name": 1, "template": 1, "description": 1}
+_NAME_INDEX_NAME = "name_1"
+_COVERING_INDEX_NAME = "prompt_covering"
+_COVERING_INDEX = [("name", 1), ("template", 1), ("description", 1)]
+
+
+class _PromptNotFound(Exception):
+    """Raised by the cache loader so unknown names skip the main prompt cache"""
 
 
 class PromptRepository:
     """Repository for managing AI prompts in MongoDB"""
     
-    # Cache for prompts to avoid repeated DB queries
-    _prompt_cache = {}
-    
-    DEFAULT_PROMPTS = {
-        "profile_extraction": {
-            "name": "profile_extraction",
-            "description": "Extract profile information from transcribed text",
-            "template": (
-                "Analyze the following transcribed text from a personal presentation video and extract profile information.\n\n"
-                "Return ONLY a valid JSON object with these fields:\n"
-                "- name: Person's name\n"
-                "- profession: Current occupation, position or specialty\n"
-                "- experience: Areas or topics with work practice or applied knowledge\n"
-                "- education: Degrees, studies or academic training. If not explicitly mentioned, infer logically from profession\n"
-                "- technologies: Tools, software, languages or specific techniques mentioned\n"
-                "- languages: List of spoken or understood languages\n"
-                "- achievements: Recognition, milestones or relevant contributions\n"
-                "- soft_skills: Social or personal skills\n\n"
-                "If any field is not present and cannot be inferred, use 'Not specified'.\n\n"
-                "Text to analyze:\n{text}\n\n"
-                "Respond ONLY with JSON, no additional text."
-            ),
-            "variables": ["text"]
-        },
-        "cv_generation": {
-            "name": "cv_generation",
-            "description": "Generate professional CV profile from transcription and extracted data",
-            "template": (
-                "Based on the following transcription and extracted profile information, write an optimized professional profile for a CV in the style of concise and impactful executive summaries. The profile must be in Spanish, professional and formal, written in impersonal third person (without mentioning the name at the beginning), structured in short and focused paragraphs. Follow this approximate structure: - First paragraph: Profession and key experience, highlighting specialties and areas of expertise. - Second paragraph: Academic training and technical knowledge/technologies. - Third paragraph: Capabilities, languages and soft skills. - Fourth paragraph: Recognition, achievements and professional commitment. Use impactful phrases, persuasive language and avoid redundancies. Integrate all relevant information coherently.\n\n"
-                "Transcription: {transcription}\n\n"
-                "Extracted information: {profile_data}\n\n"
-                "If any data is unavailable or 'Not specified', integrate it subtly or omit it if it doesn't add value. Don't use Markdown format, placeholders or additional text outside the profile. The profile must be concise, persuasive and suitable for a professional CV."
+    # Process-wide, thread-safe LRU+TTL cache shared by all instances and request
+    # threads; edits in MongoDB are picked up after the TTL
+    _prompt_cache = TTLCache(maxsize=Config.PROMPT_CACHE_MAX_SIZE, ttl=Config.PROMPT_CACHE_TTL)
+    
+    # Negative cache for names that exist neither in MongoDB nor in the defaults.
+    # Kept apart so arbitrary names sent to /prompts/{name} cannot flush real prompts
+    # out of the LRU above, and repeats skip the MongoDB round trip
+    _missing_cache = TTLCache(maxsize=Config.PROMPT_CACHE_MAX_SIZE, ttl=Config.PROMPT_CACHE_TTL)
+    
+    _instance = None
+    _lock = threading.Lock()
+    _seed_lock = threading.Lock()
+    _initialized = False
+    _indexes_ensured = False
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=1)
+    def defaults() -> Mapping:
+        """
+        Default prompts, built once on first use
+        
+        Read-only, so callers cannot mutate (and thereby poison) the shared
+        defaults; each template is only decompressed when first read.
+        
+        Returns:
+            Mapping of prompt name -> default prompt document
+        """
+        return MappingProxyType({
+            "profile_extraction": _DefaultPrompt(
+                name="profile_extraction",
+                description="Extract profile information from transcribed text",
+                variables=("text",)
             ),
-            "variables": ["transcription", "profile_data"]
-        },
-        "technical_test_generation": {
-            "name": "technical_test_generation",
-            "description": "Generate technical test for job candidate based on profile",
-            "template": (
-                "Generate a comprehensive technical test in Spanish for a job candidate with the following profile:\n\n"
-                "**Profession:** {profession}\n"
-                "**Technologies/Skills:** {technologies}\n"
-                "**Experience Level:** {experience}\n"
-                "**Education:** {education}\n\n"
-                "Create a technical assessment that includes:\n\n"
-                "1. **Theoretical Questions (30%)**: 5-7 multiple choice or short answer questions about fundamental concepts\n"
-                "2. **Practical Exercises (50%)**: 2-3 hands-on coding/problem-solving exercises appropriate to the role\n"
-                "3. **Case Study/Scenario (20%)**: 1 real-world scenario that tests analytical and decision-making skills\n\n"
-                "**Requirements:**\n"
-                "- Adjust difficulty based on experience level\n"
-                "- Focus on technologies and skills mentioned in the profile\n"
-                "- Include clear instructions and expected deliverables\n"
-                "- Provide estimated time for completion (total: 2-3 hours)\n"
-                "- Format the entire test in Markdown with proper headings, code blocks, and formatting\n"
-                "- Include a section at the end for evaluation criteria\n\n"
-                "**Format Structure:**\n"
-                "```markdown\n"
-                "# Technical Test - [Profession]\n\n"
-                "## General Information\n"
-                "- Estimated duration: X hours\n"
-                "- Technologies evaluated: [list]\n\n"
-                "## Part 1: Theoretical Questions (30%)\n"
-                "...\n\n"
-                "## Part 2: Practical Exercises (50%)\n"
-                "...\n\n"
-                "## Part 3: Case Study (20%)\n"
-                "...\n\n"
-                "## Evaluation Criteria\n"
-                "...\n"
-                "```\n\n"
-                "Generate a professional, fair, and comprehensive technical test that accurately assesses the candidate's capabilities."
+            "cv_generation": _DefaultPrompt(
+                name="cv_generation",
+                description="Generate professional CV profile from transcription and extracted data",
+                variables=("transcription", "profile_data")
             ),
-            "variables": ["profession", "technologies", "experience", "education"]
-        }
-    }
+            "technical_test_generation": _DefaultPrompt(
+                name="technical_test_generation",
+                description="Generate technical test for job candidate based on profile",
+                variables=("profession", "technologies", "experience", "education")
+            )
+        })
+    
+    @classmethod
+    def default_documents(cls) -> list:
+        """Fresh mutable copies of the default prompts, for inserting into MongoDB"""
+        return [dict(prompt) for prompt in cls.defaults().values()]
+    
+    def __new__(cls):
+        # Process-wide singleton: handlers and AI services share one repository
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+        return cls._instance
     
     def __init__(self):
-        """Initialize prompt repository with MongoDB connection"""
-        self.db_client = MongoDBClient()
-        self.collection_name = "prompts"
-        self._initialize_prompts()
-    
-    def _initialize_prompts(self):
-        """Initialize default prompts in MongoDB if not present"""
-        if not self.db_client.is_connected():
-            return
-        
-        collection = self.db_client.database[self.collection_name]
-        
-        # Check if prompts exist
-        if collection.count_documents({}) == 0:
-            print("Initializing default prompts in MongoDB...")
-            collection.insert_many(list(self.DEFAULT_PROMPTS.values()))
-            print("Default prompts initialized")
-        else:
-            # Update existing prompts and add new ones
-            for prompt_name, prompt_data in self.DEFAULT_PROMPTS.items():
-                existing = collection.find_one({"name": prompt_name})
-                if not existing:
-                    print(f"Adding new prompt: {prompt_name}")
-                    collection.insert_one(prompt_data)
-    
-    def get_prompt(self, prompt_name: str) -> Optional[str]:
+        """Initialize prompt repository with MongoDB connection (seeds defaults once per process)"""
+        if not PromptRepository._initialized:
+            # Seeds now if MongoDB is reachable; otherwise on the first access after a reconnect
+            self.collection
+    
+    @property
+    def db_client(self):
+        """MongoDB client singleton, imported on first use"""
+        return _mongodb_client_class()()
+    
+    @property
+    def collection(self):
+        """Cached prompts collection handle, or None when MongoDB is unavailable"""
+        collection = self.db_client.prompts
+        if collection is not None and not PromptRepository._initialized:
+            self._ensure_initialized(collection)
+        return collection
+    
+    def _ensure_initialized(self, collection):
+        """Create the indexes and seed the defaults once, on the first connected access"""
+        with self._seed_lock:
+            if not PromptRepository._initialized:
+                PromptRepository._initialized = self._initialize_prompts(collection)
+    
+    def _initialize_prompts(self, collection) -> bool:
+        """
+        Insert any default prompt missing from MongoDB (one idempotent batch)
+        
+        Returns:
+            False if MongoDB dropped the connection (retried on a later access);
+            True otherwise. Server-side errors such as duplicate names left by
+            older deployments are logged rather than raised, so they cannot stop
+            the app from starting.
+        """
+        from pymongo import UpdateOne
+        from pymongo.errors import ConnectionFailure, OperationFailure
+        
+        try:
+            if not PromptRepository._indexes_ensured:
+                # Unique name keeps the upserts below O(1) and safe across concurrent workers
+                try:
+                    collection.create_index("name", unique=True, name=_NAME_INDEX_NAME)
+                    collection.create_index(_COVERING_INDEX, name=_COVERING_INDEX_NAME)
+                except OperationFailure as e:
+                    print(f"Warning: Failed to create prompt indexes: {e}")
+                PromptRepository._indexes_ensured = True
+            
+            # $setOnInsert leaves existing (possibly edited) prompts untouched
+            operations = []
+            for document in self.default_documents():
+                name = document.pop("name")
+                operations.append(UpdateOne({"name": name}, {"$setOnInsert": document}, upsert=True))
+            
+            try:
+                result = collection.bulk_write(operations, ordered=False)
+            except OperationFailure as e:  # includes BulkWriteError
+                print(f"Warning: Failed to seed default prompts: {e}")
+                return True
+        except ConnectionFailure as e:
+            print(f"Warning: MongoDB unavailable while seeding prompts, will retry: {e}")
+            return False
+        
+        if result.upserted_count:
+            print(f"Added {result.upserted_count} default prompt(s) to MongoDB")
+        return True
+    
+    def get_prompt(self, prompt_name: str) -> Optional[Prompt]:
         """
-        Get prompt template by name
+        Get prompt by name
         
         Args:
             prompt_name: Name of the prompt
             
         Returns:
-            Prompt template string or None if not found
+            Immutable Prompt (shared from the cache, no copy needed) or None if not found
         """
-        # Check cache first
-        if prompt_name in self._prompt_cache:
-            return self._prompt_cache[prompt_name]
+        if self._missing_cache.get(prompt_name) is not MISS:
+            return None
         
-        if not self.db_client.is_connected():
+        try:
+            return self._prompt_cache.get_or_load(prompt_name, self._load_known_prompt)
+        except _PromptNotFound:
+            self._missing_cache.set(prompt_name, True)
+            return None
+    
+    def _load_known_prompt(self, prompt_name: str) -> Prompt:
+        """Cache loader: like _load_prompt, but raises _PromptNotFound instead of returning None"""
+        prompt = self._load_prompt(prompt_name)
+        if prompt is None:
+            raise _PromptNotFound(prompt_name)
+        return prompt
+    
+    def _load_prompt(self, prompt_name: str) -> Optional[Prompt]:
+        """Fetch a prompt from MongoDB, falling back to the defaults (uncached)"""
+        collection = self.collection
+        if collection is None:
             # Fallback to default prompts
-            template = self.DEFAULT_PROMPTS.get(prompt_name, {}).get("template")
-            self._prompt_cache[prompt_name] = template
-            return template
+            return self._default_prompt(prompt_name)
         
-        collection = self.db_client.database[self.collection_name]
-        prompt_doc = collection.find_one({"name": prompt_name})
+        prompt_doc = collection.find_one({"name": prompt_name}, projection=_PROMPT_PROJECTION)
         
-        if prompt_doc:
-            template = prompt_doc.get("template")
-            self._prompt_cache[prompt_name] = template
-            return template
+        if prompt_doc and prompt_doc.get("template"):
+            return Prompt.from_doc(prompt_doc)
         
         # Fallback to default
-        template = self.DEFAULT_PROMPTS.get(prompt_name, {}).get("template")
-        self._prompt_cache[prompt_name] = template
-        return template
+        return self._default_prompt(prompt_name)
+    
+    def _default_prompt(self, prompt_name: str) -> Optional[Prompt]:
+        """Build the default Prompt for a name, if there is one"""
+        default = self.defaults().get(prompt_name)
+        return Prompt.from_doc(default) if default else None
+    
+    def preload(self):
+        """
+        Load every stored prompt into the cache with a single MongoDB query
+        
+        Defaults that are not stored (or when MongoDB is unavailable) are cached
+        too, so steady-state lookups never leave the process until the TTL expires.
+        """
+        stored = {}
+        collection = self.collection
+        if collection is not None:
+            cursor = collection.find({}, projection=_PROMPT_PROJECTION).batch_size(Config.PROMPT_CACHE_MAX_SIZE)
+            stored = {doc["name"]: doc for doc in cursor if doc.get("template")}
+        
+        for name, doc in stored.items():
+            self._prompt_cache.set(name, Prompt.from_doc(doc))
+        
+        for name in self.defaults():
+            if name not in stored:
+                self._prompt_cache.set(name, self._default_prompt(name))
     
     def update_prompt(self, prompt_name: str, new_template: str) -> bool:
         """
@@ -151,21 +264,38 @@ class PromptRepository:
         Returns:
             True if successful, False otherwise
         """
-        if not self.db_client.is_connected():
+        collection = self.collection
+        if collection is None:
             return False
         
-        collection = self.db_client.database[self.collection_name]
-        result = collection.update_one(
+        from pymongo import ReturnDocument
+        
+        # One round trip: write and read back the stored document
+        prompt_doc = collection.find_one_and_update(
             {"name": prompt_name},
             {"$set": {"template": new_template}},
-            upsert=True
+            projection=_PROMPT_PROJECTION,
+            upsert=True,
+            return_document=ReturnDocument.AFTER
         )
         
-        # Clear cache
-        if prompt_name in self._prompt_cache:
-            del self._prompt_cache[prompt_name]
+        # Replace the cached prompt (invalidate first to detach any in-flight load)
+        self.invalidate(prompt_name)
+        if prompt_doc is None:
+            return False
+        self._prompt_cache.set(prompt_name, Prompt.from_doc(prompt_doc))
         
-        return result.modified_count > 0 or result.upserted_id is not None
+        return True
+    
+    def invalidate(self, prompt_name: str):
+        """Evict a single prompt from the cache"""
+        self._prompt_cache.invalidate(prompt_name)
+        self._missing_cache.invalidate(prompt_name)
+    
+    def invalidate_all(self):
+        """Evict every cached prompt"""
+        self._prompt_cache.invalidate_all()
+        self._missing_cache.invalidate_all()
     
     def list_prompts(self) -> list:
         """
@@ -174,16 +304,19 @@ class PromptRepository:
         Returns:
             List of prompt names
         """
-        if not self.db_client.is_connected():
-            return list(self.DEFAULT_PROMPTS.keys())
+        collection = self.collection
+        if collection is None:
+            return list(self.defaults())
         
-        collection = self.db_client.database[self.collection_name]
-        return [doc["name"] for doc in collection.find({}, {"name": 1})]
+        # Sorting on name lets the planner use the unique name index; with the
+        # projection that is a covered, index-only scan in a stable order
+        cursor = collection.find({}, {"name": 1, "_id": 0}).sort("name", 1).batch_size(100)
+        return [doc["name"] for doc in cursor]
     
     def get_prompt_with_variables(self, prompt_name: str, **kwargs) -> str:
         """Get prompt with variables replaced"""
-        template = self.get_prompt(prompt_name)
-        if not template:
+        prompt = self.get_prompt(prompt_name)
+        if not prompt:
             raise ValueError(f"Prompt '{prompt_name}' not found")
         
-        return template.format(**kwargs)
+        return prompt.render(**kwargs)
@@ -0,0 +1,136 @@
+"""
+Precompiled prompt templates
+
+Templates use str.format placeholders ({name}, with {{ and }} as escapes).
+Instead of re-parsing the whole multi-KB template on every render, each one
+is split once (with the same parser str.format uses) into literal segments
+and placeholder names and rendered with a single str.join.
+"""
+import functools
+import hashlib
+import string
+import sys
+from dataclasses import dataclass, field
+from itertools import chain
+from typing import Callable, List, Mapping, Optional, Tuple
+
+_FORMATTER = string.Formatter()
+
+
+def _split_template(template: str) -> Optional[Tuple[List[str], List[str]]]:
+    """
+    Split a template into literal segments and placeholder names
+
+    Returns:
+        (statics, names) with len(statics) == len(names) + 1, or None when the
+        template is malformed or uses anything beyond plain {name} placeholders
+        (format specs, conversions, attribute access, positional fields, ...)
+    """
+    statics = []
+    names = []
+    literal = []
+
+    try:
+        parsed = list(_FORMATTER.parse(template))
+    except ValueError:
+        return None
+
+    # Escaped braces come back as separate literal chunks; they are merged
+    # until the next real placeholder
+    for literal_text, field_name, format_spec, conversion in parsed:
+        literal.append(literal_text)
+        if field_name is None:
+            continue
+        if format_spec or conversion or not field_name.isidentifier():
+            return None
+        statics.append("".join(literal))
+        names.append(field_name)
+        literal = []
+
+    statics.append("".join(literal))
+    return statics, names
+
+
+@functools.lru_cache(maxsize=32)
+def compile_template(template: str) -> Callable[..., str]:
+    """
+    Compile a str.format-style template into a render(**kwargs) function
+
+    Results are memoized per template text, so an edited template simply
+    compiles into a new renderer. Unsupported templates fall back to
+    str.format.
+
+    Args:
+        template: Template string
+
+    Returns:
+        Function rendering the template with keyword arguments
+    """
+    split = _split_template(template)
+    if split is None:
+        return template.format
+    statics, names = split
+
+    head = statics[0]
+
+    # Specialized shapes: a constant, or a single slot between a prefix and a suffix
+    if not names:
+        return lambda **kwargs: head
+
+    if len(names) == 1:
+        slot, tail = names[0], statics[1]
+        return lambda **kwargs: head + str(kwargs[slot]) + tail
+
+    names = tuple(names)
+    leading, trailing = tuple(statics[:-1]), (statics[-1],)
+
+    def render(**kwargs) -> str:
+        values = [str(kwargs[name]) for name in names]
+        return "".join(chain(chain.from_iterable(zip(leading, values)), trailing))
+
+    return render
+
+
+def placeholder_names(template: str) -> Tuple[str, ...]:
+    """Names of the {name} placeholders in a template, in order of first use"""
+    try:
+        parsed = list(_FORMATTER.parse(template))
+    except ValueError:
+        return ()
+    return tuple(dict.fromkeys(
+        field_name for _, field_name, _, _ in parsed
+        if field_name and field_name.isidentifier()
+    ))
+
+
+@dataclass(frozen=True, slots=True)
+class Prompt:
+    """Immutable prompt with its precompiled renderer; safe to share from the cache"""
+    name: str
+    description: str
+    template: str
+    variables: Tuple[str, ...]
+    _render: Callable[..., str] = field(repr=False, compare=False)
+    etag: str = field(default="", repr=False, compare=False)
+
+    @classmethod
+    def from_doc(cls, doc: Mapping) -> "Prompt":
+        """Build a Prompt from a MongoDB document or a default prompt entry"""
+        template = doc["template"]
+        variables = doc.get("variables") or placeholder_names(template)
+        # BSON strings are never interned; interning names and variable tokens
+        # lets every cached Prompt share one object per name
+        variables = tuple(sys.intern(variable) for variable in variables)
+        return cls(
+            name=sys.intern(doc["name"]),
+            description=doc.get("description", ""),
+            template=template,
+            variables=variables,
+            _render=compile_template(template),
+            # Strong HTTP validator for the template text
+            etag=f'"{hashlib.md5(template.encode("utf-8"), usedforsecurity=False).hexdigest()}"'
+        )
+
+    def render(self, **kwargs) -> str:
+        """Render the template with the given variables"""
+        return self._render(**kwargs)
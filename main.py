@@ -1,17 +1,34 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks, Depends, Request
+from fastapi.responses import HTMLResponse, ORJSONResponse, Response
 from starlette.middleware.gzip import GZipMiddleware
 from config import Config
+from database import PromptRepository
 from services import VideoProcessor
-from services.ai_factory import AIServiceFactory
+from services.ai_factory import create_load_balancer
+from services.ai_service import UNTRANSCRIBED_TEXT
+from utils import MISS, TTLCache
 import asyncio
+import hashlib
+from contextlib import asynccontextmanager
+from typing import Tuple
 from concurrent.futures import ThreadPoolExecutor
 
 Config.validate()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Preload every prompt before serving so requests are served from memory"""
+    loop = asyncio.get_event_loop()
+    await loop.run_in_executor(executor, prompt_repo.preload)
+    yield
+
+
 app = FastAPI(
     title="Video Profile Extractor API",
-    version="1.0.1"
+    version="1.0.1",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Add GZIP compression for faster responses
@@ -23,16 +40,23 @@ video_processor = VideoProcessor(
 )
 
 # Use load balancer for intelligent task distribution
-ai_load_balancer = AIServiceFactory.create_load_balancer()
+ai_load_balancer = create_load_balancer()
 print(f"[Load Balancer] Initialized with {len(ai_load_balancer.services)} services")
 
 # Thread pool for parallel AI operations
 executor = ThreadPoolExecutor(max_workers=3)
 
+# Prompt repository singleton (same instance the AI services use)
+prompt_repo = PromptRepository()
 
-@app.get("/", response_class=HTMLResponse)
-async def get_upload_form():
-    html = """<!DOCTYPE html>
+
+def get_prompt_repo() -> PromptRepository:
+    """Dependency returning the shared prompt repository (overridable in tests)"""
+    return prompt_repo
+
+
+# Static landing page, encoded once at import
+_UPLOAD_FORM_HTML = """<!DOCTYPE html>
 <html>
 <head>
     <title>Video Profile Extractor API</title>
@@ -93,56 +117,92 @@ async def get_upload_form():
     <p><em>💡 Tip: Use Postman, curl, or your application's HTTP client to interact with the API.</em></p>
     <p><a href="/health" target="_blank">Check API Health</a> | <a href="/prompts" target="_blank">View Prompts</a></p>
 </body>
-</html>"""
-    return HTMLResponse(content=html)
+</html>""".encode("utf-8")
+_UPLOAD_FORM_ETAG = f'"{hashlib.md5(_UPLOAD_FORM_HTML, usedforsecurity=False).hexdigest()}"'
+_UPLOAD_FORM_HEADERS = {"Cache-Control": "public, max-age=3600", "ETag": _UPLOAD_FORM_ETAG}
+
+
+@app.get("/", response_class=HTMLResponse)
+async def get_upload_form(request: Request):
+    if request.headers.get("if-none-match") == _UPLOAD_FORM_ETAG:
+        return Response(status_code=304, headers=_UPLOAD_FORM_HEADERS)
+    return HTMLResponse(content=_UPLOAD_FORM_HTML, headers=_UPLOAD_FORM_HEADERS)
+
+
+# Results of processed uploads keyed by a digest of the extracted audio plus
+# the prompts that produced them, so a re-uploaded video (retries, tests) skips
+# transcription and both model calls, while a prompt edit takes effect at once
+_result_cache = TTLCache(maxsize=Config.RESULT_CACHE_MAX_SIZE, ttl=Config.RESULT_CACHE_TTL)
+
+# Prompts a pipeline result depends on
+_PIPELINE_PROMPTS = ("profile_extraction", "cv_generation")
+
+
+def _result_key(audio: bytes) -> tuple:
+    """Cache key for extracted audio: blake2b digest plus the current prompt ETags"""
+    etags = tuple(
+        prompt.etag if prompt else None
+        for prompt in map(prompt_repo.get_prompt, _PIPELINE_PROMPTS)
+    )
+    return hashlib.blake2b(audio, digest_size=16).digest(), etags
+
+
+async def _process_audio(audio: bytes) -> dict:
+    """Run the AI pipeline for extracted audio, reusing the result for identical audio"""
+    if not Config.ENABLE_CACHE:
+        return (await _run_pipeline(audio))[1]
+    
+    # Hashing a multi-MB WAV (and a possible prompt lookup) is blocking work:
+    # keep it off the event loop
+    loop = asyncio.get_event_loop()
+    key = await loop.run_in_executor(executor, _result_key, audio)
+    result = _result_cache.get(key)
+    if result is MISS:
+        transcription, result = await _run_pipeline(audio)
+        # Don't pin a degraded result for the TTL; a retry may transcribe properly
+        if transcription and transcription != UNTRANSCRIBED_TEXT:
+            _result_cache.set(key, result)
+    return result
+
+
+async def _run_pipeline(audio: bytes) -> Tuple[str, dict]:
+    """
+    Run the AI pipeline for extracted audio
+    
+    Returns:
+        (transcription, response body)
+    """
+    # Step 1: Transcribe audio (Groq - best for transcription); awaited, so
+    # Gemini's native async call does not hold an executor thread
+    transcription = await ai_load_balancer.transcribe_audio_async(audio)
+    
+    # Step 2 & 3: Extract profile information and generate the CV profile
+    # (one model call when a single service handles both). Blocking SDK calls: run on the executor
+    loop = asyncio.get_event_loop()
+    profile_data, cv_profile = await loop.run_in_executor(
+        executor, ai_load_balancer.extract_and_generate, transcription
+    )
+    
+    return transcription, {
+        "cv_profile": cv_profile,
+        "profile_data": profile_data
+    }
 
 
 @app.post("/upload-video")
 async def upload_video(file: UploadFile = File(...)):
-    video_path = None
-    audio_path = None
-    
     try:
-        # Process video and extract audio
-        video_path, audio_path = video_processor.process_video(file)
-        
-        # Step 1: Transcribe audio (Groq - best for transcription)
-        loop = asyncio.get_event_loop()
-        transcription = await loop.run_in_executor(
-            executor,
-            ai_load_balancer.transcribe_audio,
-            audio_path
-        )
-        
-        # Step 2 & 3: Run profile extraction and CV generation in parallel
-        profile_task = loop.run_in_executor(
-            executor,
-            ai_load_balancer.extract_profile,
-            transcription
-        )
-        
-        # Wait for profile extraction first
-        profile_data = await profile_task
-        
-        # Step 3: Generate CV profile (can start immediately after profile extraction)
-        cv_profile = await loop.run_in_executor(
-            executor,
-            ai_load_balancer.generate_cv_profile,
-            transcription,
-            profile_data
-        )
+        # Copy the upload to disk on the executor and run FFmpeg as an awaited
+        # subprocess, so neither blocks the event loop.
+        # The workspace (and the video in it) is removed as soon as the audio is out
+        with video_processor.workspace() as workdir:
+            video_path = await video_processor.save_upload(file, directory=workdir, executor=executor)
+            audio = await video_processor.extract_audio_async(video_path)
         
-        return JSONResponse(content={
-            "cv_profile": cv_profile,
-            "profile_data": profile_data
-        })
+        return await _process_audio(audio)
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    
-    finally:
-        if video_path and audio_path:
-            video_processor.cleanup(video_path, audio_path)
 
 
 @app.get("/health")
@@ -150,34 +210,34 @@ async def health_check():
     return {"status": "healthy"}
 
 
+# The prompt handlers are plain `def`: FastAPI runs them in its threadpool, so a
+# MongoDB query or reconnect attempt (up to the server selection timeout) never
+# blocks the event loop
 @app.get("/prompts")
-async def list_prompts():
+def list_prompts(prompt_repo: PromptRepository = Depends(get_prompt_repo)):
     """List all available prompts"""
-    from database import PromptRepository
-    prompt_repo = PromptRepository()
     prompts = prompt_repo.list_prompts()
     return {"prompts": prompts}
 
 
 @app.get("/prompts/{prompt_name}")
-async def get_prompt(prompt_name: str):
-    """Get a specific prompt template"""
-    from database import PromptRepository
-    prompt_repo = PromptRepository()
-    template = prompt_repo.get_prompt(prompt_name)
+def get_prompt(prompt_name: str, request: Request, prompt_repo: PromptRepository = Depends(get_prompt_repo)):
+    """Get a specific prompt template (conditional GET via ETag)"""
+    prompt = prompt_repo.get_prompt(prompt_name)
     
-    if not template:
+    if not prompt:
         raise HTTPException(status_code=404, detail=f"Prompt '{prompt_name}' not found")
     
-    return {"name": prompt_name, "template": template}
+    headers = {"ETag": prompt.etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == prompt.etag:
+        return Response(status_code=304, headers=headers)
+    
+    return ORJSONResponse({"name": prompt_name, "template": prompt.template}, headers=headers)
 
 
 @app.put("/prompts/{prompt_name}")
-async def update_prompt(prompt_name: str, new_template: dict):
+def update_prompt(prompt_name: str, new_template: dict, prompt_repo: PromptRepository = Depends(get_prompt_repo)):
     """Update a prompt template"""
-    from database import PromptRepository
-    prompt_repo = PromptRepository()
-    
     if "template" not in new_template:
         raise HTTPException(status_code=400, detail="Field 'template' is required")
     
@@ -190,32 +250,28 @@ async def update_prompt(prompt_name: str, new_template: dict):
 
 
 @app.post("/prompts/reset")
-async def reset_prompts():
+def reset_prompts(prompt_repo: PromptRepository = Depends(get_prompt_repo)):
     """Reset all prompts to default values (useful after code updates)"""
-    from database import PromptRepository
-    prompt_repo = PromptRepository()
-    
-    if not prompt_repo.db_client.is_connected():
+    collection = prompt_repo.collection
+    if collection is None:
         raise HTTPException(status_code=500, detail="Cannot connect to MongoDB")
     
-    collection = prompt_repo.db_client.database[prompt_repo.collection_name]
-    
     # Delete all existing prompts
     result = collection.delete_many({})
     deleted_count = result.deleted_count
     
-    # Insert updated prompts from DEFAULT_PROMPTS
-    collection.insert_many(list(prompt_repo.DEFAULT_PROMPTS.values()))
-    inserted_count = len(prompt_repo.DEFAULT_PROMPTS)
+    # Insert updated prompts from the defaults
+    collection.insert_many(prompt_repo.default_documents())
+    inserted_count = len(prompt_repo.defaults())
     
     # Clear cache
-    prompt_repo._prompt_cache.clear()
+    prompt_repo.invalidate_all()
     
     return {
         "message": "All prompts reset to default values",
         "deleted": deleted_count,
         "inserted": inserted_count,
-        "prompts": list(prompt_repo.DEFAULT_PROMPTS.keys())
+        "prompts": list(prompt_repo.defaults())
     }
 
 
@@ -252,14 +308,14 @@ async def generate_technical_test(profile_data: dict):
             profile_data
         )
         
-        return JSONResponse(content={
+        return {
             "technical_test_markdown": technical_test,
             "profile_summary": {
                 "profession": profile_data.get("profession"),
                 "technologies": profile_data.get("technologies"),
                 "experience": profile_data.get("experience", "Not specified")
             }
-        })
+        }
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -267,4 +323,12 @@ async def generate_technical_test(profile_data: dict):
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host=Config.HOST, port=Config.PORT)
+    # uvicorn's "auto" loop/http pick uvloop and httptools when installed
+    # (uvicorn[standard], not on Windows) and fall back to asyncio/h11 otherwise.
+    # Multiple workers need an import string so each process can load the app.
+    uvicorn.run(
+        "main:app" if Config.WORKERS > 1 else app,
+        host=Config.HOST,
+        port=Config.PORT,
+        workers=Config.WORKERS
+    )
@@ -0,0 +1,47 @@
+"""
+Generate env_config.py from a .env file
+
+The generated module holds a literal ENV dict so that config.py can import
+it (bytecode-cached by Python) instead of parsing .env on every start.
+
+Usage:
+    python scripts/build_env_config.py [path/to/.env] [path/to/env_config.py]
+"""
+import os
+import sys
+from dotenv import dotenv_values
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def build_env_config(env_path: str, output_path: str) -> int:
+    """
+    Write env_config.py with the values parsed from env_path
+
+    Args:
+        env_path: Source .env file
+        output_path: Destination Python module
+
+    Returns:
+        Number of variables written
+    """
+    values = {key: value for key, value in dotenv_values(env_path).items() if value is not None}
+
+    lines = [
+        "# Generated by scripts/build_env_config.py - do not edit or commit",
+        "ENV = {",
+    ]
+    lines.extend(f"    {key!r}: {value!r}," for key, value in sorted(values.items()))
+    lines.append("}")
+
+    with open(output_path, "w", encoding="utf-8") as file:
+        file.write("\n".join(lines) + "\n")
+
+    return len(values)
+
+
+if __name__ == "__main__":
+    env_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(ROOT_DIR, ".env")
+    output_path = sys.argv[2] if len(sys.argv) > 2 else os.path.join(ROOT_DIR, "env_config.py")
+    count = build_env_config(env_path, output_path)
+    print(f"Wrote {count} variables to {output_path}")
@@ -1,5 +1,5 @@
-from .ai_service import AIService, GroqService, GeminiService, HuggingFaceService
+from .ai_service import AIService, GroqService, GeminiService, HuggingFaceService, OpenRouterService, Profile
 from .video_processor import VideoProcessor
 from .load_balancer import AILoadBalancer
 
-__all__ = ['AIService', 'GroqService', 'GeminiService', 'HuggingFaceService', 'VideoProcessor', 'AILoadBalancer']
+__all__ = ['AIService', 'GroqService', 'GeminiService', 'HuggingFaceService', 'OpenRouterService', 'Profile', 'VideoProcessor', 'AILoadBalancer']
@@ -1,111 +1,146 @@
+import functools
+import importlib.util
+import threading
 from typing import Optional, Dict
 from config import Config
-from .ai_service import AIService, GroqService, GeminiService, HuggingFaceService, OpenRouterService
+from .ai_service import AIService, GeminiService, GroqService, HuggingFaceService, OpenRouterService
 from .load_balancer import AILoadBalancer
 
 
+def _sdk_installed(module_name: str, package_name: str) -> bool:
+    """Check that an SDK is importable without importing it"""
+    try:
+        if importlib.util.find_spec(module_name) is not None:
+            return True
+    except ModuleNotFoundError:
+        # Parent package of a dotted name (e.g. "google") is missing
+        pass
+    print(f"Warning: {package_name} library not installed. Install with: pip install {package_name}")
+    return False
+
+
+@functools.lru_cache(maxsize=1)
+def create_service() -> AIService:
+    """Create AI service with automatic fallback (legacy method, built once)"""
+    services = create_all_services()
+    if not services:
+        raise RuntimeError("No AI service available. Check your API keys and dependencies.")
+    
+    # Return first available service for backward compatibility
+    return list(services.values())[0]
+
+
+@functools.lru_cache(maxsize=1)
+def create_load_balancer() -> AILoadBalancer:
+    """Create load balancer with all available services (built once)"""
+    services = create_all_services()
+    if not services:
+        raise RuntimeError("No AI service available. Check your API keys and dependencies.")
+    
+    return AILoadBalancer(services)
+
+
+# Process-wide service instances, shared by create_service() and create_load_balancer()
+_services_lock = threading.Lock()
+_services: Optional[Dict[str, AIService]] = None
+
+
+def create_all_services() -> Dict[str, AIService]:
+    """Create all available AI services (built once per process, then shared)"""
+    global _services
+    if _services is None:
+        with _services_lock:
+            if _services is None:
+                _services = _build_all_services()
+    return _services
+
+
+def reset_services():
+    """Forget the shared services and factory results (for tests)"""
+    global _services
+    with _services_lock:
+        _services = None
+        create_service.cache_clear()
+        create_load_balancer.cache_clear()
+
+
+def _build_all_services() -> Dict[str, AIService]:
+    """
+    Probe every configured provider and create its service
+    
+    A provider is used when its API key is set and its SDK is installed;
+    constructing a service is cheap and cannot fail, since the SDK client is
+    only built on first use.
+    """
+    services = {}
+    
+    # Try to create each service
+    groq = _try_create_groq()
+    if groq:
+        services['groq'] = groq
+    
+    gemini = _try_create_gemini()
+    if gemini:
+        services['gemini'] = gemini
+    
+    openrouter = _try_create_openrouter()
+    if openrouter:
+        services['openrouter'] = openrouter
+    
+    hf = _try_create_huggingface()
+    if hf:
+        services['huggingface'] = hf
+    
+    return services
+
+
+def _try_create_groq() -> Optional[AIService]:
+    """Try to create Groq service"""
+    if not Config.GROQ_API_KEY:
+        return None
+    
+    if not _sdk_installed("groq", "groq"):
+        return None
+    
+    return GroqService()
+
+
+def _try_create_gemini() -> Optional[AIService]:
+    """Try to create Gemini service"""
+    if not Config.GEMINI_API_KEY:
+        return None
+    
+    if not _sdk_installed("google.generativeai", "google-generativeai"):
+        return None
+    
+    return GeminiService()
+
+
+def _try_create_openrouter() -> Optional[AIService]:
+    """Try to create OpenRouter service"""
+    if not Config.OPENROUTER_API_KEY:
+        return None
+    
+    if not _sdk_installed("openai", "openai"):
+        return None
+    
+    return OpenRouterService()
+
+
+def _try_create_huggingface() -> Optional[AIService]:
+    """Try to create Hugging Face service"""
+    if not Config.HUGGINGFACE_API_KEY:
+        return None
+    
+    if not _sdk_installed("huggingface_hub", "huggingface_hub"):
+        return None
+    
+    return HuggingFaceService()
+
+
 class AIServiceFactory:
-    """Factory for creating AI service instances with load balancing support"""
-    
-    @staticmethod
-    def create_service() -> AIService:
-        """Create AI service with automatic fallback (legacy method)"""
-        services = AIServiceFactory.create_all_services()
-        if not services:
-            raise RuntimeError("No AI service available. Check your API keys and dependencies.")
-        
-        # Return first available service for backward compatibility
-        return list(services.values())[0]
-    
-    @staticmethod
-    def create_load_balancer() -> AILoadBalancer:
-        """Create load balancer with all available services"""
-        services = AIServiceFactory.create_all_services()
-        if not services:
-            raise RuntimeError("No AI service available. Check your API keys and dependencies.")
-        
-        return AILoadBalancer(services)
-    
-    @staticmethod
-    def create_all_services() -> Dict[str, AIService]:
-        """Create all available AI services"""
-        services = {}
-        
-        # Try to create each service
-        groq = AIServiceFactory._try_create_groq()
-        if groq:
-            services['groq'] = groq
-        
-        gemini = AIServiceFactory._try_create_gemini()
-        if gemini:
-            services['gemini'] = gemini
-        
-        openrouter = AIServiceFactory._try_create_openrouter()
-        if openrouter:
-            services['openrouter'] = openrouter
-        
-        hf = AIServiceFactory._try_create_huggingface()
-        if hf:
-            services['huggingface'] = hf
-        
-        return services
-    
-    @staticmethod
-    def _try_create_groq() -> Optional[AIService]:
-        """Try to create Groq service"""
-        if not Config.GROQ_API_KEY:
-            return None
-        
-        try:
-            return GroqService()
-        except ImportError:
-            print("Warning: Groq library not installed. Install with: pip install groq")
-            return None
-        except Exception as e:
-            print(f"Warning: Failed to initialize Groq service: {e}")
-            return None
-    
-    @staticmethod
-    def _try_create_gemini() -> Optional[AIService]:
-        """Try to create Gemini service"""
-        if not Config.GEMINI_API_KEY:
-            return None
-        
-        try:
-            return GeminiService()
-        except ImportError:
-            print("Warning: Google Generative AI library not installed. Install with: pip install google-generativeai")
-            return None
-        except Exception as e:
-            print(f"Warning: Failed to initialize Gemini service: {e}")
-            return None
-    
-    @staticmethod
-    def _try_create_openrouter() -> Optional[AIService]:
-        """Try to create OpenRouter service"""
-        if not Config.OPENROUTER_API_KEY:
-            return None
-        
-        try:
-            return OpenRouterService()
-        except ImportError:
-            print("Warning: OpenAI library not installed. Install with: pip install openai")
-            return None
-        except Exception as e:
-            print(f"Warning: Failed to initialize OpenRouter service: {e}")
-            return None
-    
-    @staticmethod
-    def _try_create_huggingface() -> Optional[AIService]:
-        """Try to create Hugging Face service"""
-        if not Config.HUGGINGFACE_API_KEY:
-            return None
-        
-        try:
-            return HuggingFaceService()
-        except ImportError:
-            print("Warning: Hugging Face Hub library not installed. Install with: pip install huggingface_hub")
-            return None
-        except Exception as e:
-            print(f"Warning: Failed to initialize Hugging Face service: {e}")
-            return None
+    """Backward-compatible namespace for the factory functions above"""
+    
+    create_service = staticmethod(create_service)
+    create_load_balancer = staticmethod(create_load_balancer)
+    create_all_services = staticmethod(create_all_services)
@@ -1,19 +1,105 @@
-import json
+import asyncio
+import atexit
+import functools
+import importlib.util
+import io
+import threading
 import re
+import orjson
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Iterator, Tuple, Union
 from config import Config
 from database import PromptRepository
 
+# Response clean-up patterns, compiled once
+_CODE_FENCE_RE = re.compile(r'```(?:json)?\s*')
+_JSON_OBJECT_RE = re.compile(r'\{.*\}', re.DOTALL)
+_TRAILING_COMMA_RE = re.compile(r',(\s*[}\]])')
+
+
+# Returned by transcribe_audio when the model produced no text
+UNTRANSCRIBED_TEXT = "Unable to transcribe audio."
+
+
+@dataclass(frozen=True)
+class Profile:
+    """Extracted profile with its JSON form serialized once, for reuse across prompt builds"""
+    data: dict
+    json: str
+    
+    @classmethod
+    def of(cls, profile_data: Union[dict, "Profile"]) -> "Profile":
+        """Wrap a profile dict (an existing Profile is returned unchanged)"""
+        if isinstance(profile_data, Profile):
+            return profile_data
+        return cls(profile_data, orjson.dumps(profile_data).decode())
+
+
+def _profile_json(profile_data: Union[dict, Profile]) -> str:
+    """JSON text of a profile, reusing the serialization a Profile already carries"""
+    if isinstance(profile_data, Profile):
+        return profile_data.json
+    return orjson.dumps(profile_data).decode()
+
+
+_http_client = None
+_http_client_lock = threading.Lock()
+
+
+def shared_http_client():
+    """
+    Process-wide keep-alive httpx client for the httpx-based SDKs (Groq, OpenAI)
+    
+    Connections, and their TLS sessions, are reused across calls and requests;
+    HTTP/2 is enabled when the optional h2 package is installed.
+    """
+    global _http_client
+    if _http_client is None:
+        with _http_client_lock:
+            if _http_client is None:
+                import httpx
+                _http_client = httpx.Client(
+                    http2=importlib.util.find_spec("h2") is not None,
+                    limits=httpx.Limits(
+                        max_keepalive_connections=Config.HTTP_MAX_KEEPALIVE,
+                        keepalive_expiry=Config.HTTP_KEEPALIVE_EXPIRY
+                    ),
+                    timeout=httpx.Timeout(Config.REQUEST_TIMEOUT)
+                )
+                # Closed at process exit, not on app shutdown: the SDK clients cached
+                # on the shared services keep using it if the app is started again
+                atexit.register(close_http_client)
+    return _http_client
+
+
+def close_http_client():
+    """Close the shared HTTP client, if it was created (registered to run at exit)"""
+    global _http_client
+    with _http_client_lock:
+        if _http_client is not None:
+            _http_client.close()
+            _http_client = None
+
+
+def _iter_deltas(chunks) -> Iterator[str]:
+    """Yield the text deltas of a streamed chat completion"""
+    for chunk in chunks:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
 
 class AIService(ABC):
     """Abstract base class for AI services"""
     
-    def __init__(self):
-        self.prompt_repo = PromptRepository()
+    @functools.cached_property
+    def prompt_repo(self) -> PromptRepository:
+        """Shared prompt repository, acquired on the first prompt lookup"""
+        return PromptRepository()
     
     @abstractmethod
-    def transcribe_audio(self, audio_path: str) -> str:
-        """Transcribe audio file to text"""
+    def transcribe_audio(self, audio: bytes, filename: str = "audio.wav") -> str:
+        """Transcribe in-memory audio (WAV bytes) to text"""
         pass
     
     @abstractmethod
@@ -22,7 +108,7 @@ class AIService(ABC):
         pass
     
     @abstractmethod
-    def generate_cv_profile(self, transcription: str, profile_data: dict) -> str:
+    def generate_cv_profile(self, transcription: str, profile_data: Union[dict, Profile]) -> str:
         """Generate professional CV profile"""
         pass
     
@@ -30,29 +116,51 @@ class AIService(ABC):
     def generate_technical_test(self, profile_data: dict) -> str:
         """Generate technical test based on profile"""
         pass
+    
+    async def transcribe_audio_async(self, audio: bytes, filename: str = "audio.wav") -> str:
+        """Transcribe without blocking the event loop (default: the sync call on a worker thread)"""
+        return await asyncio.to_thread(self.transcribe_audio, audio, filename)
+    
+    def generate_cv_profile_stream(self, transcription: str, profile_data: Union[dict, Profile]) -> Iterator[str]:
+        """Generate the CV profile as text chunks (default: a single chunk)"""
+        yield self.generate_cv_profile(transcription, profile_data)
+    
+    def extract_and_generate(self, text: str) -> Tuple[dict, str]:
+        """
+        Extract the profile and generate the CV profile for a transcription
+        
+        Services that can do both in one model call override this; the default
+        makes the two calls in sequence.
+        
+        Returns:
+            (profile_data, cv_profile)
+        """
+        profile_data = self.extract_profile(text)
+        return profile_data, self.generate_cv_profile(text, profile_data)
 
 
 class GroqService(AIService):
     """Groq AI service implementation"""
     
-    def __init__(self):
-        super().__init__()
+    @functools.cached_property
+    def client(self):
+        """Groq SDK client, imported and built on first use"""
         from groq import Groq
-        self.client = Groq(api_key=Config.GROQ_API_KEY)
+        client = Groq(api_key=Config.GROQ_API_KEY, http_client=shared_http_client())
         print("Groq AI service initialized")
+        return client
     
-    def transcribe_audio(self, audio_path: str) -> str:
+    def transcribe_audio(self, audio: bytes, filename: str = "audio.wav") -> str:
         """Transcribe audio using Groq Whisper"""
         try:
-            with open(audio_path, "rb") as file:
-                transcription = self.client.audio.transcriptions.create(
-                    file=(audio_path, file.read()),
-                    model=Config.GROQ_TRANSCRIPTION_MODEL,
-                    prompt="Transcribe this audio. It's a personal or professional presentation.",
-                    response_format="text",
-                    language="es"
-                )
-            return transcription.strip() if transcription else "Unable to transcribe audio."
+            transcription = self.client.audio.transcriptions.create(
+                file=(filename, audio),
+                model=Config.GROQ_TRANSCRIPTION_MODEL,
+                prompt="Transcribe this audio. It's a personal or professional presentation.",
+                response_format="text",
+                language="es"
+            )
+            return transcription.strip() if transcription else UNTRANSCRIBED_TEXT
         except Exception as e:
             raise Exception(f"Groq transcription error: {str(e)}")
     
@@ -100,12 +208,16 @@ class GroqService(AIService):
             print(f"[Groq] Profile extraction failed: {str(e)}")
             raise Exception(f"Groq profile extraction error: {str(e)}")
     
-    def generate_cv_profile(self, transcription: str, profile_data: dict) -> str:
+    def generate_cv_profile(self, transcription: str, profile_data: Union[dict, Profile]) -> str:
         """Generate CV profile using Groq"""
+        return "".join(self.generate_cv_profile_stream(transcription, profile_data)).strip()
+    
+    def generate_cv_profile_stream(self, transcription: str, profile_data: Union[dict, Profile]) -> Iterator[str]:
+        """Stream the CV profile from Groq as text chunks"""
         prompt = self.prompt_repo.get_prompt_with_variables(
             "cv_generation",
             transcription=transcription,
-            profile_data=json.dumps(profile_data, ensure_ascii=False)
+            profile_data=_profile_json(profile_data)
         )
         
         try:
@@ -118,9 +230,9 @@ class GroqService(AIService):
                 temperature=0.3,
                 max_tokens=1800,
                 top_p=0.95,
-                stream=False
+                stream=True
             )
-            return response.choices[0].message.content.strip()
+            yield from _iter_deltas(response)
         except Exception as e:
             raise Exception(f"Groq CV generation error: {str(e)}")
     
@@ -150,37 +262,71 @@ class GroqService(AIService):
         except Exception as e:
             raise Exception(f"Groq technical test generation error: {str(e)}")
     
+    def extract_and_generate(self, text: str) -> Tuple[dict, str]:
+        """Extract the profile and write the CV profile in a single Groq completion"""
+        profile_prompt = self.prompt_repo.get_prompt_with_variables("profile_extraction", text=text)
+        # The transcription is sent once, in task 1; task 2 refers back to it
+        cv_prompt = self.prompt_repo.get_prompt_with_variables(
+            "cv_generation",
+            transcription="(the same text analyzed in Task 1)",
+            profile_data="(the profile object you produce for Task 1)"
+        )
+        
+        try:
+            response = self.client.chat.completions.create(
+                model=Config.GROQ_CHAT_MODEL,
+                messages=[
+                    {"role": "system", "content": 'You complete two tasks about a transcribed presentation. You MUST respond with ONLY a valid JSON object of the form {"profile": {...}, "cv_text": "..."}: "profile" is the JSON object requested in Task 1 and "cv_text" is the plain-text CV profile requested in Task 2. ALL values must be in SPANISH.'},
+                    {"role": "user", "content": f"Task 1:\n{profile_prompt}\n\nTask 2:\n{cv_prompt}"}
+                ],
+                temperature=0.2,
+                max_tokens=3000,
+                top_p=0.9,
+                stream=False,
+                response_format={"type": "json_object"}
+            )
+            parsed = self._parse_json_response(response.choices[0].message.content.strip())
+        except Exception as e:
+            raise Exception(f"Groq combined profile/CV error: {str(e)}")
+        
+        profile_data = parsed.get("profile")
+        cv_profile = parsed.get("cv_text")
+        if not isinstance(profile_data, dict) or not isinstance(cv_profile, str) or not cv_profile.strip():
+            raise ValueError(f"Groq combined response is missing 'profile' or 'cv_text': {list(parsed)}")
+        
+        return profile_data, cv_profile.strip()
+    
     @staticmethod
     def _parse_json_response(response_text: str) -> dict:
         """Parse JSON from AI response with robust error handling"""
         # Remove markdown code blocks if present
-        response_text = re.sub(r'```json\s*', '', response_text)
-        response_text = re.sub(r'```\s*', '', response_text)
+        if "```" in response_text:
+            response_text = _CODE_FENCE_RE.sub('', response_text)
         response_text = response_text.strip()
         
         # Try to parse directly first
         try:
-            return json.loads(response_text)
-        except json.JSONDecodeError as e:
+            return orjson.loads(response_text)
+        except orjson.JSONDecodeError as e:
             print(f"[JSON Parser] Direct parse failed: {str(e)}")
             print(f"[JSON Parser] Response text (first 300 chars): {response_text[:300]}")
         
         # Try to find JSON object in the response (greedy match)
-        json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
+        json_match = _JSON_OBJECT_RE.search(response_text)
         if json_match:
             json_str = json_match.group()
             try:
-                return json.loads(json_str)
-            except json.JSONDecodeError as e:
+                return orjson.loads(json_str)
+            except orjson.JSONDecodeError as e:
                 print(f"[JSON Parser] Regex match parse failed: {str(e)}")
                 print(f"[JSON Parser] Matched JSON (first 300 chars): {json_str[:300]}")
                 
                 # Try to fix common issues
                 # Remove trailing commas before closing braces
-                json_str_fixed = re.sub(r',(\s*[}\]])', r'\1', json_str)
+                json_str_fixed = _TRAILING_COMMA_RE.sub(r'\1', json_str)
                 try:
-                    return json.loads(json_str_fixed)
-                except json.JSONDecodeError:
+                    return orjson.loads(json_str_fixed)
+                except orjson.JSONDecodeError:
                     raise ValueError(f"Invalid JSON in response: {str(e)}\nResponse: {response_text[:300]}")
         
         raise ValueError(f"No valid JSON found in response: {response_text[:300]}")
@@ -189,29 +335,46 @@ class GroqService(AIService):
 class GeminiService(AIService):
     """Gemini AI service implementation"""
     
-    def __init__(self):
-        super().__init__()
+    @functools.cached_property
+    def genai(self):
+        """google.generativeai module, imported and configured on first use"""
         import google.generativeai as genai
         genai.configure(api_key=Config.GEMINI_API_KEY)
-        
+        return genai
+    
+    @functools.cached_property
+    def model(self):
+        """Gemini model, built on first use"""
         try:
-            self.model = genai.GenerativeModel(Config.GEMINI_MODEL)
+            model = self.genai.GenerativeModel(Config.GEMINI_MODEL)
             print(f"Gemini AI service initialized with {Config.GEMINI_MODEL}")
         except Exception:
-            self.model = genai.GenerativeModel(Config.GEMINI_FALLBACK_MODEL)
+            model = self.genai.GenerativeModel(Config.GEMINI_FALLBACK_MODEL)
             print(f"Gemini AI service initialized with {Config.GEMINI_FALLBACK_MODEL}")
-        
-        self.genai = genai
+        return model
+    
+    _TRANSCRIPTION_PROMPT = "Transcribe this audio. Provide only the speech transcription, without additional comments or special formatting."
     
-    def transcribe_audio(self, audio_path: str) -> str:
+    def _upload_audio(self, audio: bytes, filename: str):
+        """Upload WAV bytes to the Gemini File API"""
+        return self.genai.upload_file(io.BytesIO(audio), mime_type="audio/wav", display_name=filename)
+    
+    def transcribe_audio(self, audio: bytes, filename: str = "audio.wav") -> str:
         """Transcribe audio using Gemini"""
         try:
-            audio_file = self.genai.upload_file(audio_path)
-            response = self.model.generate_content([
-                "Transcribe this audio. Provide only the speech transcription, without additional comments or special formatting.",
-                audio_file
-            ])
-            return response.text.strip() if response.text else "Unable to transcribe audio."
+            audio_file = self._upload_audio(audio, filename)
+            response = self.model.generate_content([self._TRANSCRIPTION_PROMPT, audio_file])
+            return response.text.strip() if response.text else UNTRANSCRIBED_TEXT
+        except Exception as e:
+            raise Exception(f"Gemini transcription error: {str(e)}")
+    
+    async def transcribe_audio_async(self, audio: bytes, filename: str = "audio.wav") -> str:
+        """Transcribe audio using Gemini, awaiting the native async generate call"""
+        try:
+            # The SDK has no async upload, so only the upload takes a worker thread
+            audio_file = await asyncio.to_thread(self._upload_audio, audio, filename)
+            response = await self.model.generate_content_async([self._TRANSCRIPTION_PROMPT, audio_file])
+            return response.text.strip() if response.text else UNTRANSCRIBED_TEXT
         except Exception as e:
             raise Exception(f"Gemini transcription error: {str(e)}")
     
@@ -226,17 +389,22 @@ class GeminiService(AIService):
         except Exception as e:
             raise Exception(f"Gemini profile extraction error: {str(e)}")
     
-    def generate_cv_profile(self, transcription: str, profile_data: dict) -> str:
+    def generate_cv_profile(self, transcription: str, profile_data: Union[dict, Profile]) -> str:
         """Generate CV profile using Gemini"""
+        return "".join(self.generate_cv_profile_stream(transcription, profile_data)).strip()
+    
+    def generate_cv_profile_stream(self, transcription: str, profile_data: Union[dict, Profile]) -> Iterator[str]:
+        """Stream the CV profile from Gemini as text chunks"""
         prompt = self.prompt_repo.get_prompt_with_variables(
             "cv_generation",
             transcription=transcription,
-            profile_data=json.dumps(profile_data, ensure_ascii=False)
+            profile_data=_profile_json(profile_data)
         )
         
         try:
-            response = self.model.generate_content(prompt)
-            return response.text.strip()
+            response = self.model.generate_content(prompt, stream=True)
+            for chunk in response:
+                yield chunk.text
         except Exception as e:
             raise Exception(f"Gemini CV generation error: {str(e)}")
     
@@ -261,13 +429,17 @@ class HuggingFaceService(AIService):
     """Hugging Face Inference API service implementation"""
     
     def __init__(self):
-        super().__init__()
-        from huggingface_hub import InferenceClient
-        self.client = InferenceClient(token=Config.HUGGINGFACE_API_KEY)
         self.model = Config.HUGGINGFACE_MODEL
+    
+    @functools.cached_property
+    def client(self):
+        """Hugging Face inference client, imported and built on first use"""
+        from huggingface_hub import InferenceClient
+        client = InferenceClient(token=Config.HUGGINGFACE_API_KEY)
         print(f"Hugging Face service initialized with {self.model}")
+        return client
     
-    def transcribe_audio(self, audio_path: str) -> str:
+    def transcribe_audio(self, audio: bytes, filename: str = "audio.wav") -> str:
         """Hugging Face doesn't support audio transcription in free tier"""
         raise NotImplementedError("Hugging Face free tier does not support audio transcription. Use Groq or Gemini for this feature.")
     
@@ -291,12 +463,16 @@ class HuggingFaceService(AIService):
         except Exception as e:
             raise Exception(f"Hugging Face profile extraction error: {str(e)}")
     
-    def generate_cv_profile(self, transcription: str, profile_data: dict) -> str:
+    def generate_cv_profile(self, transcription: str, profile_data: Union[dict, Profile]) -> str:
         """Generate CV profile using Hugging Face"""
+        return "".join(self.generate_cv_profile_stream(transcription, profile_data)).strip()
+    
+    def generate_cv_profile_stream(self, transcription: str, profile_data: Union[dict, Profile]) -> Iterator[str]:
+        """Stream the CV profile from Hugging Face as text chunks"""
         prompt = self.prompt_repo.get_prompt_with_variables(
             "cv_generation",
             transcription=transcription,
-            profile_data=json.dumps(profile_data, ensure_ascii=False)
+            profile_data=_profile_json(profile_data)
         )
         
         try:
@@ -307,9 +483,10 @@ class HuggingFaceService(AIService):
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.3,
-                max_tokens=1500
+                max_tokens=1500,
+                stream=True
             )
-            return response.choices[0].message.content.strip()
+            yield from _iter_deltas(response)
         except Exception as e:
             raise Exception(f"Hugging Face CV generation error: {str(e)}")
     
@@ -343,16 +520,21 @@ class OpenRouterService(AIService):
     """OpenRouter AI service implementation (OpenAI-compatible)"""
     
     def __init__(self):
-        super().__init__()
+        self.model = Config.OPENROUTER_MODEL
+    
+    @functools.cached_property
+    def client(self):
+        """OpenAI-compatible client for OpenRouter, imported and built on first use"""
         from openai import OpenAI
-        self.client = OpenAI(
+        client = OpenAI(
             api_key=Config.OPENROUTER_API_KEY,
-            base_url=Config.OPENROUTER_BASE_URL
+            base_url=Config.OPENROUTER_BASE_URL,
+            http_client=shared_http_client()
         )
-        self.model = Config.OPENROUTER_MODEL
         print(f"OpenRouter service initialized with {self.model}")
+        return client
     
-    def transcribe_audio(self, audio_path: str) -> str:
+    def transcribe_audio(self, audio: bytes, filename: str = "audio.wav") -> str:
         """OpenRouter doesn't support audio transcription"""
         raise NotImplementedError("OpenRouter service does not support audio transcription. Use Groq or Gemini for this feature.")
     
@@ -376,12 +558,16 @@ class OpenRouterService(AIService):
         except Exception as e:
             raise Exception(f"OpenRouter profile extraction error: {str(e)}")
     
-    def generate_cv_profile(self, transcription: str, profile_data: dict) -> str:
+    def generate_cv_profile(self, transcription: str, profile_data: Union[dict, Profile]) -> str:
         """Generate CV profile using OpenRouter"""
+        return "".join(self.generate_cv_profile_stream(transcription, profile_data)).strip()
+    
+    def generate_cv_profile_stream(self, transcription: str, profile_data: Union[dict, Profile]) -> Iterator[str]:
+        """Stream the CV profile from OpenRouter as text chunks"""
         prompt = self.prompt_repo.get_prompt_with_variables(
             "cv_generation",
             transcription=transcription,
-            profile_data=json.dumps(profile_data, ensure_ascii=False)
+            profile_data=_profile_json(profile_data)
         )
         
         try:
@@ -392,9 +578,10 @@ class OpenRouterService(AIService):
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.3,
-                max_tokens=1500
+                max_tokens=1500,
+                stream=True
             )
-            return response.choices[0].message.content.strip()
+            yield from _iter_deltas(response)
         except Exception as e:
             raise Exception(f"OpenRouter CV generation error: {str(e)}")
     
@@ -2,9 +2,9 @@
 Load Balancer for AI Services
 Distributes tasks to specialized services for optimal performance
 """
-from typing import Dict
+from typing import Dict, Iterator, Tuple, Union
 from config import Config
-from .ai_service import AIService
+from .ai_service import AIService, Profile
 
 
 class AILoadBalancer:
@@ -70,31 +70,68 @@ class AILoadBalancer:
         
         raise RuntimeError(f"No service available for task: {task}")
     
-    def transcribe_audio(self, audio_path: str) -> str:
-        """Route transcription to best service with fallback"""
+    @staticmethod
+    def _is_rate_limited(error_msg: str) -> bool:
+        """True for quota / rate-limit errors, the ones worth retrying elsewhere"""
+        error_msg = error_msg.lower()
+        return "429" in error_msg or "quota" in error_msg or "rate limit" in error_msg
+    
+    # Only these services support transcription, in fallback order
+    _TRANSCRIPTION_SERVICES = ('groq', 'gemini')
+    
+    def _transcription_service(self) -> AIService:
+        """Primary service for transcription (logs the choice)"""
         service = self.get_service_for_task('transcription')
         print(f"[Load Balancer] Using {type(service).__name__} for transcription")
+        return service
+    
+    def _transcription_fallbacks(self, failed: AIService, error: Exception) -> Iterator[AIService]:
+        """
+        Services to retry a failed transcription on, in order
+        
+        Yields nothing unless the error is a quota or rate-limit error; shared by
+        the sync and async paths so both follow the same fallback policy.
+        """
+        error_msg = str(error)
+        print(f"[Load Balancer] Error with {type(failed).__name__}: {error_msg}")
+        
+        if not self._is_rate_limited(error_msg):
+            return
+        
+        print(f"[Load Balancer] Attempting fallback for transcription...")
+        for service_name in self._TRANSCRIPTION_SERVICES:
+            fallback_service = self.services.get(service_name)
+            if fallback_service is not None and fallback_service != failed:
+                print(f"[Load Balancer] Trying {type(fallback_service).__name__}...")
+                yield fallback_service
+    
+    def transcribe_audio(self, audio: bytes, filename: str = "audio.wav") -> str:
+        """Route transcription to best service with fallback"""
+        service = self._transcription_service()
         
         try:
-            return service.transcribe_audio(audio_path)
+            return service.transcribe_audio(audio, filename)
         except Exception as e:
-            error_msg = str(e)
-            print(f"[Load Balancer] Error with {type(service).__name__}: {error_msg}")
+            for fallback_service in self._transcription_fallbacks(service, e):
+                try:
+                    return fallback_service.transcribe_audio(audio, filename)
+                except Exception as fallback_error:
+                    print(f"[Load Balancer] Fallback failed: {str(fallback_error)}")
             
-            # Try fallback for transcription (only Groq and Gemini support it)
-            if "429" in error_msg or "quota" in error_msg.lower() or "rate limit" in error_msg.lower():
-                print(f"[Load Balancer] Attempting fallback for transcription...")
-                
-                for service_name in ['groq', 'gemini']:  # Only these support transcription
-                    if service_name in self.services:
-                        fallback_service = self.services[service_name]
-                        if fallback_service != service:
-                            try:
-                                print(f"[Load Balancer] Trying {type(fallback_service).__name__}...")
-                                return fallback_service.transcribe_audio(audio_path)
-                            except Exception as fallback_error:
-                                print(f"[Load Balancer] Fallback failed: {str(fallback_error)}")
-                                continue
+            raise e
+    
+    async def transcribe_audio_async(self, audio: bytes, filename: str = "audio.wav") -> str:
+        """Route transcription like transcribe_audio, awaiting the services' async variants"""
+        service = self._transcription_service()
+        
+        try:
+            return await service.transcribe_audio_async(audio, filename)
+        except Exception as e:
+            for fallback_service in self._transcription_fallbacks(service, e):
+                try:
+                    return await fallback_service.transcribe_audio_async(audio, filename)
+                except Exception as fallback_error:
+                    print(f"[Load Balancer] Fallback failed: {str(fallback_error)}")
             
             raise e
     
@@ -128,8 +165,47 @@ class AILoadBalancer:
             
             raise e
     
-    def generate_cv_profile(self, transcription: str, profile_data: dict) -> str:
+    def extract_and_generate(self, transcription: str) -> Tuple[dict, str]:
+        """
+        Extract the profile and generate the CV profile
+        
+        When one service handles both tasks, both come from a single model call.
+        If that call is rate limited, the other services are tried in fallback
+        order (retrying the limited service would only fail again); on any
+        other error, or when the tasks are routed to different services, the
+        two steps run separately, each with its own fallback.
+        
+        Returns:
+            (profile_data, cv_profile)
+        """
+        service = self.get_service_for_task('profile_extraction')
+        if service is self.get_service_for_task('cv_generation'):
+            print(f"[Load Balancer] Using {type(service).__name__} for profile extraction + CV generation")
+            try:
+                return service.extract_and_generate(transcription)
+            except Exception as e:
+                error_msg = str(e)
+                if not self._is_rate_limited(error_msg):
+                    print(f"[Load Balancer] Combined call failed with {type(service).__name__}: {error_msg}; using separate calls")
+                else:
+                    print(f"[Load Balancer] {type(service).__name__} rate limited: {error_msg}; attempting fallback for profile extraction + CV generation...")
+                    for service_name in self.fallback_order:
+                        fallback_service = self.services.get(service_name)
+                        if fallback_service is not None and fallback_service != service:
+                            try:
+                                print(f"[Load Balancer] Trying {type(fallback_service).__name__}...")
+                                return fallback_service.extract_and_generate(transcription)
+                            except Exception as fallback_error:
+                                print(f"[Load Balancer] Fallback failed: {str(fallback_error)}")
+                    raise e
+        
+        profile_data = self.extract_profile(transcription)
+        return profile_data, self.generate_cv_profile(transcription, profile_data)
+    
+    def generate_cv_profile(self, transcription: str, profile_data: Union[dict, Profile]) -> str:
         """Route CV generation to best service with fallback"""
+        # Serialize the profile once; fallbacks reuse the same JSON
+        profile_data = Profile.of(profile_data)
         service = self.get_service_for_task('cv_generation')
         print(f"[Load Balancer] Using {type(service).__name__} for CV generation")
         
@@ -158,6 +234,18 @@ class AILoadBalancer:
             # If all fallbacks fail, raise original error
             raise e
     
+    def generate_cv_profile_stream(self, transcription: str, profile_data: dict) -> Iterator[str]:
+        """
+        Stream CV generation from the best service as text chunks
+        
+        No fallback: once chunks have been handed to the caller a retry on
+        another service would duplicate output. Use generate_cv_profile() when
+        fallback matters more than time-to-first-byte.
+        """
+        service = self.get_service_for_task('cv_generation')
+        print(f"[Load Balancer] Streaming CV generation from {type(service).__name__}")
+        return service.generate_cv_profile_stream(transcription, profile_data)
+    
     def generate_technical_test(self, profile_data: dict) -> str:
         """Route technical test generation to best service with fallback"""
         service = self.get_service_for_task('technical_test')
@@ -1,10 +1,50 @@
+import asyncio
 import os
-import subprocess
-import tempfile
 import shutil
-from typing import Tuple
+import tempfile
+from concurrent.futures import Executor
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, List, Optional
 from fastapi import UploadFile
 
+# 1 MB copy buffer: far fewer read/write syscalls than shutil's default for large videos
+_COPY_BUFFER_SIZE = 1 << 20
+
+
+def _finalize_wav_header(wav: bytes) -> bytes:
+    """
+    Fill in the RIFF and data chunk sizes of a WAV written to a pipe
+    
+    FFmpeg cannot seek back on non-seekable output, so it leaves placeholder
+    sizes that some decoders reject. Only the header is copied to be patched;
+    the samples are joined on through a memoryview, so the audio is copied once.
+    """
+    if len(wav) < 12 or wav[:4] != b"RIFF" or wav[8:12] != b"WAVE":
+        return wav
+    
+    header_end = 12
+    data_offset = None
+    offset = 12
+    while offset + 8 <= len(wav):
+        if wav[offset:offset + 4] == b"data":
+            data_offset = offset
+            header_end = offset + 8
+            break
+        chunk_size = int.from_bytes(wav[offset + 4:offset + 8], "little")
+        offset += 8 + chunk_size + (chunk_size & 1)
+    
+    header = bytearray(wav[:header_end])
+    header[4:8] = (len(wav) - 8).to_bytes(4, "little")
+    if data_offset is not None:
+        header[data_offset + 4:data_offset + 8] = (len(wav) - data_offset - 8).to_bytes(4, "little")
+    return bytes(header) + memoryview(wav)[header_end:]
+
+
+def _copy_to_file(source: BinaryIO, path: str):
+    """Copy a file object to a new file at path with the 1 MB buffer"""
+    with open(path, "wb") as target:
+        shutil.copyfileobj(source, target, length=_COPY_BUFFER_SIZE)
+
 
 class VideoProcessor:
     """Handles video file processing and audio extraction"""
@@ -13,46 +53,83 @@ class VideoProcessor:
         self.sample_rate = sample_rate
         self.channels = channels
     
-    def process_video(self, video_file: UploadFile) -> Tuple[str, str]:
+    @staticmethod
+    @contextmanager
+    def workspace() -> Iterator[str]:
         """
-        Process uploaded video and extract audio
-        Returns: (video_path, audio_path)
+        Temporary directory for one request's files, removed as a whole on exit
+        
+        Cleanup is guaranteed however the block exits, so callers no longer
+        track and unlink individual files.
         """
-        video_path = self._save_video(video_file)
-        audio_path = self._extract_audio(video_path)
-        return video_path, audio_path
+        with tempfile.TemporaryDirectory(prefix="video-") as directory:
+            yield directory
     
     @staticmethod
-    def _save_video(video_file: UploadFile) -> str:
-        """Save uploaded video to temporary file"""
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4")
-        temp_path = temp_file.name
+    async def save_upload(video_file: UploadFile, directory: str,
+                          executor: Optional[Executor] = None) -> str:
+        """
+        Copy an upload to a temporary file without blocking the event loop
         
-        with temp_file:
-            shutil.copyfileobj(video_file.file, temp_file)
+        The whole copy runs as one executor job with a 1 MB buffer, instead of
+        one event-loop round trip per chunk.
         
-        return temp_path
+        Args:
+            video_file: Uploaded video
+            directory: Workspace to save into (see workspace()); the file is
+                removed with the directory
+            executor: Executor the copy runs on (default: the loop's)
+            
+        Returns:
+            Path of the temporary video file
+        """
+        video_path = os.path.join(directory, "in.mp4")
+        await asyncio.get_running_loop().run_in_executor(
+            executor, _copy_to_file, video_file.file, video_path
+        )
+        return video_path
     
-    def _extract_audio(self, video_path: str) -> str:
-        """Extract audio from video using FFmpeg"""
-        audio_path = video_path.replace('.mp4', '.wav')
-        
-        subprocess.run([
-            "ffmpeg", "-i", video_path,
+    def _ffmpeg_command(self, video_path: str) -> List[str]:
+        """FFmpeg arguments extracting mono PCM WAV audio to stdout"""
+        # -loglevel error keeps stderr down to actual errors, so it is cheap to
+        # keep for diagnostics
+        return [
+            "ffmpeg", "-nostdin", "-loglevel", "error",
+            "-i", video_path,
             "-vn", "-acodec", "pcm_s16le",
             "-ar", self.sample_rate,
             "-ac", self.channels,
-            audio_path
-        ], check=True, capture_output=True)
-        
-        return audio_path
+            "-f", "wav", "pipe:1"
+        ]
     
-    @staticmethod
-    def cleanup(video_path: str, audio_path: str):
-        """Clean up temporary files"""
-        for path in [video_path, audio_path]:
-            if path and os.path.exists(path):
-                try:
-                    os.unlink(path)
-                except Exception as e:
-                    print(f"Warning: Failed to delete {path}: {e}")
+    async def extract_audio_async(self, video_path: str) -> bytes:
+        """
+        Extract audio as in-memory WAV bytes (no .wav on disk), awaiting FFmpeg
+        instead of blocking a thread
+        
+        Args:
+            video_path: Path of the saved video
+            
+        Returns:
+            WAV bytes
+        """
+        process = await asyncio.create_subprocess_exec(
+            *self._ffmpeg_command(video_path),
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            stdout, stderr = await process.communicate()
+        except BaseException:
+            # Request cancelled: don't leave FFmpeg running
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            raise
+        
+        if process.returncode != 0:
+            error = stderr.decode("utf-8", "replace").strip()
+            raise RuntimeError(f"FFmpeg audio extraction failed: {error or f'exit status {process.returncode}'}")
+        
+        return _finalize_wav_header(stdout)
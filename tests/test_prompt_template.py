@@ -0,0 +1,53 @@
+import pytest
+
+from database.prompt_template import Prompt, compile_template, placeholder_names
+
+VALUES = {"text": "hola", "name": "Ana", "profile_data": '{"a": 1}'}
+
+
+@pytest.mark.parametrize("template", [
+    "",
+    "no placeholders at all",
+    "escaped {{braces}} only }}{{",
+    "{text}",
+    "before {text}",
+    "{text} after",
+    "JSON example: {{\"name\": \"{name}\"}}",
+    "{text} and {name} and {text} again",
+    "{{{text}}} nested escapes {{{{ {name} }}}}",
+    "Profile: {profile_data}\nText: {text}",
+])
+def test_render_matches_str_format(template):
+    assert compile_template(template)(**VALUES) == template.format(**VALUES)
+
+
+@pytest.mark.parametrize("template", [
+    "{text!r}",
+    "{text:>10}",
+    "{text.upper}",
+])
+def test_unsupported_fields_fall_back_to_str_format(template):
+    assert compile_template(template)(**VALUES) == template.format(**VALUES)
+
+
+def test_positional_fields_fall_back_to_str_format():
+    assert compile_template("{0}-{1}")("a", "b") == "a-b"
+
+
+def test_missing_variable_raises_key_error():
+    with pytest.raises(KeyError):
+        compile_template("{text} {name}")(text="x")
+
+
+def test_placeholder_names_in_order_of_first_use():
+    assert placeholder_names("{b} {{skip}} {a} {b}") == ("b", "a")
+    assert placeholder_names("unbalanced {") == ()
+
+
+def test_prompt_from_doc_derives_variables_and_etag():
+    prompt = Prompt.from_doc({"name": "p", "template": "Hi {name}, {text}"})
+    other = Prompt.from_doc({"name": "p", "template": "Hi {name}!"})
+    
+    assert prompt.variables == ("name", "text")
+    assert prompt.render(**VALUES) == "Hi Ana, hola"
+    assert prompt.etag.startswith('"') and prompt.etag != other.etag
@@ -0,0 +1,80 @@
+import threading
+import time
+
+import pytest
+
+from utils import MISS, TTLCache
+
+
+def test_get_returns_miss_for_absent_and_expired_keys():
+    cache = TTLCache(maxsize=4, ttl=0.05)
+    assert cache.get("a") is MISS
+    
+    cache.set("a", None)
+    assert cache.get("a") is None
+    
+    time.sleep(0.1)
+    assert cache.get("a") is MISS
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    
+    assert cache.get("b") is MISS
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_concurrent_get_or_load_calls_loader_once():
+    cache = TTLCache(maxsize=4, ttl=60)
+    calls = []
+    release = threading.Event()
+    
+    def loader(key):
+        calls.append(key)
+        release.wait(5)
+        return f"value-{key}"
+    
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_load("k", loader)))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    
+    assert calls == ["k"]
+    assert results == ["value-k"] * 8
+    assert cache.get("k") == "value-k"
+
+
+def test_loader_error_propagates_and_is_not_cached():
+    cache = TTLCache(maxsize=4, ttl=60)
+    
+    def failing(key):
+        raise LookupError(key)
+    
+    with pytest.raises(LookupError):
+        cache.get_or_load("k", failing)
+    
+    assert cache.get("k") is MISS
+    assert cache.get_or_load("k", lambda key: 42) == 42
+
+
+def test_invalidate_during_load_skips_storing_the_result():
+    cache = TTLCache(maxsize=4, ttl=60)
+    
+    def loader(key):
+        cache.invalidate(key)
+        return "stale"
+    
+    assert cache.get_or_load("k", loader) == "stale"
+    assert cache.get("k") is MISS
@@ -0,0 +1,39 @@
+import io
+import struct
+import wave
+
+from services.video_processor import _finalize_wav_header
+
+
+def _piped_wav(samples: bytes, extra_chunk: bytes = b"") -> bytes:
+    """WAV as FFmpeg writes it to a pipe: RIFF and data sizes left as placeholders"""
+    fmt = b"fmt " + struct.pack("<IHHIIHH", 16, 1, 1, 16000, 32000, 2, 16)
+    return b"RIFF" + b"\xff" * 4 + b"WAVE" + fmt + extra_chunk + b"data" + b"\xff" * 4 + samples
+
+
+def test_patched_sizes_match_buffer_length():
+    samples = b"\x01\x00" * 1000
+    wav = _finalize_wav_header(_piped_wav(samples))
+    
+    assert isinstance(wav, bytes)
+    assert int.from_bytes(wav[4:8], "little") == len(wav) - 8
+    data_offset = wav.index(b"data")
+    assert int.from_bytes(wav[data_offset + 4:data_offset + 8], "little") == len(samples)
+    assert wav[data_offset + 8:] == samples
+    
+    with wave.open(io.BytesIO(wav)) as reader:
+        assert reader.getnframes() == 1000
+
+
+def test_data_chunk_found_after_other_chunks():
+    # Odd-sized LIST chunk: RIFF chunks are padded to an even length
+    list_chunk = b"LIST" + struct.pack("<I", 5) + b"INFO\x00" + b"\x00"
+    samples = b"\x02\x00" * 10
+    wav = _finalize_wav_header(_piped_wav(samples, list_chunk))
+    
+    data_offset = wav.index(b"data")
+    assert int.from_bytes(wav[data_offset + 4:data_offset + 8], "little") == len(samples)
+
+
+def test_non_wav_input_is_returned_unchanged():
+    assert _finalize_wav_header(b"not a wav file") == b"not a wav file"
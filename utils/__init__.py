@@ -1,3 +1,4 @@
 from .logger import setup_logger
+from .ttl_cache import MISS, TTLCache
 
-__all__ = ['setup_logger']
+__all__ = ['setup_logger', 'MISS', 'TTLCache']
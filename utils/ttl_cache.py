@@ -0,0 +1,126 @@
+"""
+Bounded LRU cache with per-entry TTL
+
+Thread-safe: one process-wide instance is shared by every request thread.
+Concurrent misses for the same key are collapsed into a single load
+(single-flight), so a cold-start burst runs each expensive load once
+(e.g. one MongoDB query per prompt).
+"""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable
+
+# Returned by TTLCache.get() when a key is absent or expired
+MISS = object()
+
+
+class TTLCache:
+    """LRU cache that also expires entries after a fixed time-to-live"""
+
+    def __init__(self, maxsize: int = 64, ttl: float = 300):
+        """
+        Args:
+            maxsize: Maximum number of entries kept before evicting the least recently used
+            ttl: Seconds an entry stays valid after being stored
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, Future] = {}
+
+    def get(self, key: Hashable) -> Any:
+        """
+        Get a cached value
+
+        Returns:
+            The cached value (which may be None) or MISS
+        """
+        with self._lock:
+            return self._get_locked(key)
+
+    def _get_locked(self, key: Hashable) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return MISS
+
+        inserted_at, value = entry
+        if time.monotonic() - inserted_at > self.ttl:
+            self._entries.pop(key, None)
+            return MISS
+
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        """Store a value, evicting the least recently used entry if full"""
+        with self._lock:
+            self._set_locked(key, value)
+
+    def _set_locked(self, key: Hashable, value: Any):
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def get_or_load(self, key: Hashable, loader: Callable[[Hashable], Any]) -> Any:
+        """
+        Get a cached value, loading it on a miss
+
+        Only the first thread to miss calls loader(key); concurrent callers for
+        the same key wait for that result. Loader errors propagate to all of
+        them and nothing is cached.
+
+        Args:
+            key: Cache key
+            loader: Function computing the value for key
+
+        Returns:
+            The cached or freshly loaded value
+        """
+        with self._lock:
+            value = self._get_locked(key)
+            if value is not MISS:
+                return value
+
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+
+        if not owner:
+            return future.result()
+
+        try:
+            value = loader(key)
+        except BaseException as e:
+            with self._lock:
+                if self._inflight.get(key) is future:
+                    del self._inflight[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            # Skip storing if the key was invalidated while loading
+            if self._inflight.pop(key, None) is future:
+                self._set_locked(key, value)
+        future.set_result(value)
+        return value
+
+    def invalidate(self, key: Hashable):
+        """Evict a single entry (and detach any in-flight load for it)"""
+        with self._lock:
+            self._entries.pop(key, None)
+            self._inflight.pop(key, None)
+
+    def invalidate_all(self):
+        """Evict every entry"""
+        with self._lock:
+            self._entries.clear()
+            self._inflight.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)